@@ -1,64 +1,337 @@
 # Python standard libraries
 import argparse
+import atexit
+import functools
+import hashlib
+import html
+import io
 import json
 import logging
+import mmap
 import os
 import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
-from typing import List, Optional, Any, Iterator, Tuple, Union, BinaryIO, Callable
+from pathlib import Path
+from types import MappingProxyType
+from typing import List, Optional, Any, Iterator, TextIO, Tuple, Union, BinaryIO, Callable
 
-# Third-party libraries
-from requests import Response, post
-from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, RequestException
-from tqdm import tqdm
-from pdfminer.converter import PDFPageAggregator
-from pdfminer.layout import LAParams, LTTextContainer, LTTextBox, LTTextLine, LTFigure, LTChar, LTPage
-from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
-from pdfminer.pdfpage import PDFPage
+# Third-party libraries (requests, tqdm, pdfminer, and optionally PyMuPDF and
+# orjson) are imported lazily inside the functions that need them, so startup
+# paths like --help never pay their import cost.
+
+# orjson parses and serializes several times faster than stdlib json; the
+# token-usage log falls back to stdlib json when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Batched translation settings: how many pages may share one API call and how
+# large (in characters) their combined text may grow before a new call starts.
+BATCH_MAX_PAGES = 6
+BATCH_CHAR_BUDGET = 12000
+# A batch still under this fraction of the budget may absorb one page that
+# overflows the budget by up to the tolerance, instead of opening a new,
+# underfilled batch (and paying for another API call).
+BATCH_UNDERFILL_RATIO = 0.7
+BATCH_OVERFLOW_RATIO = 1.25
+# How many translation requests may be in flight at once.
+MAX_CONCURRENT_REQUESTS = 8
+MODEL = "gpt-3.5-turbo"
+# Completed translations are cached on disk so re-runs of the same pages do
+# not pay for another API call.
+CACHE_DIR = os.path.join('data', 'llm_cache')
+# Batch-API jobs run for up to 24 hours; their ids are recorded here so an
+# interrupted run can resume polling instead of paying to resubmit.
+PENDING_BATCHES_FILE = os.path.join('data', 'pending_batches.json')
+BATCH_POLL_INTERVAL = 30  # seconds between Batch API status checks
+# Running token totals across all runs, for keeping an eye on API spend.
+TOKEN_USAGE_FILE = os.path.join('data', 'token_usage.json')
+API_BASE = "https://api.openai.com/v1"
+SECTION_TAG_PATTERN = re.compile(r"<<(\d+)>>(.*?)(?=<<\d+>>|$)", re.S)
+PROF_NAME_PATTERN = re.compile(r"PROF_(.+)_NAME")
+UNSAFE_FILENAME_PATTERN = re.compile(r"[^\w\-.]")
+UNDERSCORE_RUN_PATTERN = re.compile(r"_+")
+# ASCII fast path for make_safe_filename: every byte the pattern above would
+# reject maps to '_' in one C-level translate pass.
+SAFE_FILENAME_TABLE = str.maketrans({c: '_' for c in map(chr, range(128))
+                                     if not (c.isalnum() or c in '-_.')})
+WHITESPACE_RUN_PATTERN = re.compile(r"\s+")
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\n\s*\n+")
+# Inverse of the break pattern: matches one block — from a non-space
+# character up to the next blank(ish) line — so callers can walk the blocks
+# of a string without materializing the full split list.
+PARAGRAPH_BLOCK_PATTERN = re.compile(r"\S(?:[^\n]|\n(?!\s*\n))*")
+# Turns in-block line breaks into ReportLab <br/> tags (and drops stray
+# carriage returns) in one translate pass per block.
+LINE_BREAK_TABLE = str.maketrans({'\n': '<br/>', '\r': ''})
+
+# Input files are dispatched on their leading magic bytes rather than their
+# extension, so a mislabeled file still lands on the right path.
+FILE_SIGNATURES = MappingProxyType({b'%PDF': 'pdf', b'PK\x03\x04': 'zip'})
+
+# Output format implied by the -o extension; anything unlisted is written as
+# plain text. One splitext + dict lookup replaces chained endswith checks.
+OUTPUT_FORMATS = MappingProxyType({'.pdf': 'pdf', '.txt': 'txt'})
+
+# WordprocessingML namespace for reading DOCX part XML directly, plus the
+# Clark-notation tags iterparse filters on.
+WORD_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+WORD_P_TAG = f'{{{WORD_NS}}}p'
+WORD_T_TAG = f'{{{WORD_NS}}}t'
+# Plain-text inputs are re-chunked into pages of roughly this many characters.
+TARGET_PAGE_SIZE = 3000
+
+# Single source of truth for the supported source languages; the CLI flags
+# below are generated from it.
+LANGUAGE_MAP = MappingProxyType({
+    'C': 'Chinese',
+    'J': 'Japanese',
+    'K': 'Korean',
+})
 
 
 def validate_page_nums(value: str) -> str:
-    if not re.match(r"^\d+(-\d+)?$", value):
+    # Equivalent to matching ^\d+(-\d+)?$, but str.isdecimal scans the string
+    # once in C with no regex state machine. isdecimal (not isdigit, which
+    # also accepts characters like '²') matches exactly what int() parses.
+    start, sep, end = value.partition('-')
+    if not (start.isdecimal() and (end.isdecimal() if sep else True)):
         raise argparse.ArgumentTypeError("Letters, commas, and other symbols not allowed.")
     return value
 
 
-parser = argparse.ArgumentParser(description='Extract text from PDF and translate it using the GPT engine.')
+# Declarative tables the argument parser is assembled from; adding an option
+# is a one-line edit here instead of another add_argument block below.
+SOURCE_ARGUMENTS = (
+    (('-i', '--input_PDF'), {'dest': 'input_PDF', 'type': str,
+                             'help': 'The name of the input PDF file'}),
+    (('-c', '--custom_text'), {'dest': 'custom_text', 'action': 'store_true',
+                               'help': 'Input custom text to be translated'}),
+)
+PLAIN_ARGUMENTS = (
+    (('-p', '--page_nums'), {'dest': 'page_nums', 'type': str,
+                             'help': 'Page numbers to output\nEnter either a single page number or a range in this '
+                                     'format: [starting page number]-[ending page number]\nNo spaces, letters, '
+                                     'commas or other symbols are allowed'}),
+    (('-a', '--abstract'), {'dest': 'abstract', 'action': 'store_true',
+                            'help': 'The text has an abstract'}),
+    (('--no-cache',), {'dest': 'no_cache', 'action': 'store_true',
+                       'help': 'Do not read or write the on-disk translation cache'}),
+    (('--batch',), {'dest': 'batch', 'action': 'store_true',
+                    'help': 'Submit the document through the OpenAI Batch API '
+                            '(half price, up to 24h turnaround)'}),
+    (('--usage-report',), {'dest': 'usage_report', 'action': 'store_true',
+                           'help': 'Print accumulated token usage and exit'}),
+    (('-o', '--output'), {'dest': 'output', 'type': str, 'nargs': '?', 'const': '',
+                          'help': 'Save the translation to a file instead of printing it; with no value, '
+                                  'the name is derived from the input file'}),
+    (('--professor',), {'dest': 'professor', 'type': str,
+                        'help': 'Bill the run to a professor\'s API key (PROF_<ID>_NAME / PROF_<ID>_KEY '
+                                'environment variables); usage is logged per professor'}),
+)
+
+
+@functools.cache
+def create_argument_parser() -> argparse.ArgumentParser:
+    """Builds the CLI parser once; repeated calls reuse the same object."""
+    parser = argparse.ArgumentParser(description='Extract text from PDF and translate it using the GPT engine.')
+
+    # The groups are not marked required so admin flags like --usage-report
+    # can run alone; main() enforces them for translation runs.
+    input_group = parser.add_mutually_exclusive_group()
+    for code, language_name in LANGUAGE_MAP.items():
+        input_group.add_argument(f'-{code}', f'--{language_name}', dest='input_type', action='store_const',
+                                 const=language_name, help=f'Input is {language_name} text')
+
+    source_group = parser.add_mutually_exclusive_group()
+    for flags, options in SOURCE_ARGUMENTS:
+        source_group.add_argument(*flags, **options)
+
+    for flags, options in PLAIN_ARGUMENTS:
+        parser.add_argument(*flags, **options)
+
+    return parser
+
+
+# Global state for the script, populated from the parsed arguments by
+# configure(); importing the module no longer parses sys.argv.
+file: Optional[str] = None
+custom_text = False
+language: Optional[str] = None
+page_nums: Optional[str] = None
+abstract = False
+no_cache = False
+use_batch_api = False
+output_path: Optional[str] = None
+professor: Optional[str] = None
+
+# Prompts are frozen once per run so every request starts with a byte-identical
+# static prefix (instructions and language pair); only the page text varies.
+PROMPT_SYSTEM_PAGE = ""
+PROMPT_USER_PREFIX_PAGE = ""
+PROMPT_SYSTEM_BATCH = ""
+PROMPT_USER_PREFIX_BATCH = ""
+
+
+def configure(args: argparse.Namespace) -> None:
+    """Applies parsed CLI arguments to the module-level script state."""
+    global file, custom_text, language, page_nums, abstract, no_cache, use_batch_api, output_path
+    global PROMPT_SYSTEM_PAGE, PROMPT_USER_PREFIX_PAGE, PROMPT_SYSTEM_BATCH, PROMPT_USER_PREFIX_BATCH
 
-input_group = parser.add_mutually_exclusive_group(required=True)
-input_group.add_argument('-C', '--Chinese', dest='input_type', action='store_const', const='Chinese',
-                         help='Input is Chinese text')
-input_group.add_argument('-J', '--Japanese', dest='input_type', action='store_const', const='Japanese',
-                         help='Input is Japanese text')
-input_group.add_argument('-K', '--Korean', dest='input_type', action='store_const', const='Korean',
-                         help='Input is Korean text')
+    # Resolve the input path once; everything downstream (open, the
+    # pending-batch resume key) reuses the absolute form.
+    file = os.path.abspath(args.input_PDF) if args.input_PDF else None
+    custom_text = args.custom_text
+    language = args.input_type
+    page_nums = validate_page_nums(args.page_nums) if args.page_nums else None
+    abstract = args.abstract
+    no_cache = args.no_cache
+    use_batch_api = args.batch
+    set_professor(args.professor)
+
+    # One pathlib parse yields parent/stem for the derived output name; the
+    # os.path.splitext/dirname/basename churn is paid exactly once, here.
+    if args.output:
+        output_path = args.output
+    elif args.output is not None:  # bare -o: derive the name from the input
+        if file:
+            input_path = Path(file)
+            output_path = str(input_path.with_name(f"{input_path.stem}_translated.txt"))
+        else:
+            output_path = 'custom_text_translated.txt'
+    else:
+        output_path = None
+
+    PROMPT_SYSTEM_PAGE = (f'Follow the instructions carefully. Please act as a professional translator from '
+                          f'{language} to English. I will provide you with text from a PDF document, and your task '
+                          f'is to translate it from {language} to English. Please only output the translation and do '
+                          f'not output any irrelevant content. If there are garbled characters or other non-standard '
+                          f'text content, delete the garbled characters. '
+                          f'You can format and line break the output yourself using "\\n" for line breaks. '
+                          f'You may be provided with "--Context: " and the text from either the document\'s abstract '
+                          f'or a sample of text from the previous page. You will also be provided with '
+                          f'"--Current Page: " which includes the OCR characters of the current page. Only output '
+                          f'the English translation of the "--Current Page: ". Do not output the context, nor the '
+                          f'"--Context: " and "--Current Page: " labels.')
+    PROMPT_USER_PREFIX_PAGE = (f'Translate only the {language} text of the "--Current Page: ", without outputting '
+                               f'any other content, and without outputting anything related to "--Context: ", if '
+                               f'provided. Do not provide any prompts to the user, for example: "This is the '
+                               f'translation of the current page.":\n')
+    PROMPT_SYSTEM_BATCH = (f'Follow the instructions carefully. Please act as a professional translator from '
+                           f'{language} to English. I will provide you with numbered sections of text from a PDF '
+                           f'document, each starting with a "<<n>>" tag. Translate every section from {language} to '
+                           f'English. If there are garbled characters or other non-standard text content, delete the '
+                           f'garbled characters. Output only the translations, each preceded by its original "<<n>>" '
+                           f'tag, and do not output any other content.')
+    PROMPT_USER_PREFIX_BATCH = (f'Translate each of the following numbered sections from {language} to English. '
+                                f'Return every translation tagged with its section number, for example '
+                                f'"<<1>>...<<2>>...":\n')
+
+
+def load_env_file() -> None:
+    """Loads KEY=VALUE pairs from ./.env into the environment, if it exists.
+
+    Only the working directory is checked — no parent-directory walk — and
+    existing environment variables are never overridden.
+    """
+    try:
+        with open('.env', encoding='utf-8') as env_file:
+            lines = env_file.read().splitlines()
+    except OSError:
+        return
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, _, value = line.partition('=')
+        os.environ.setdefault(key.strip(), value.strip().strip('\'"'))
+
+
+def make_safe_filename(name: str) -> str:
+    """Reduces an arbitrary display name to a filesystem-safe token."""
+    # ASCII names take the translate fast path; anything else falls back to
+    # the regex, whose \w keeps non-ASCII word characters just like translate
+    # leaves them untouched.
+    if name.isascii():
+        safe = name.translate(SAFE_FILENAME_TABLE)
+    else:
+        safe = UNSAFE_FILENAME_PATTERN.sub('_', name)
+    return UNDERSCORE_RUN_PATTERN.sub('_', safe).strip('_').lower()
+
+
+@functools.lru_cache(maxsize=1)
+def load_professor_config() -> "dict[str, Tuple[str, str]]":
+    """Maps professor ids to (display name, key variable), scanned once.
+
+    Professors are declared in the environment (or .env) as paired
+    PROF_<ID>_NAME and PROF_<ID>_KEY variables. The environment is walked a
+    single time and the result is cached for the life of the process.
+    """
+    load_env_file()
+    # Snapshot the environment into a plain dict so the lookups below hit a
+    # real dict instead of the os.environ proxy's __contains__/__getitem__
+    # dispatch on every probe.
+    env = dict(os.environ)
+    # One pass over the variable names: a single fullmatch replaces the
+    # startswith/endswith/slice combination, and ids whose _KEY counterpart is
+    # missing are dropped here rather than failing later in get_api_key().
+    matches = filter(None, map(PROF_NAME_PATTERN.fullmatch, env))
+    return {match.group(1).lower(): (env[match.string], f'PROF_{match.group(1)}_KEY')
+            for match in matches if f'PROF_{match.group(1)}_KEY' in env}
 
-source_group = parser.add_mutually_exclusive_group(required=True)
-source_group.add_argument('-i', '--input_PDF', dest='input_PDF', type=str,
-                          help='The name of the input PDF file')
-source_group.add_argument('-c', '--custom_text', dest='custom_text', action='store_true',
-                          help='Input custom text to be translated')
 
-parser.add_argument('-p', '--page_nums', dest='page_nums', type=str,
-                    help='Page numbers to output\nEnter either a single page number or a range in this format: '
-                         '[starting page number]-[ending page number]\nNo spaces, letters, commas or other symbols '
-                         'are allowed')
+def set_professor(name: Optional[str]) -> None:
+    """Selects whose API key and usage log the rest of the run uses."""
+    global professor, TOKEN_USAGE_FILE
+    professor = name
+    if name:
+        TOKEN_USAGE_FILE = os.path.join('data', f'token_usage_{make_safe_filename(name)}.json')
+        get_api_key.cache_clear()
 
-parser.add_argument('-a', '--abstract', dest='abstract', action='store_true',
-                    help='The text has an abstract')
 
-args = parser.parse_args()
+@functools.cache
+def get_api_key() -> str:
+    """Reads the API key from the environment once; later calls hit the cache."""
+    if professor:
+        config = load_professor_config()
+        entry = config.get(professor.lower())
+        if entry is None:
+            # One sweep over the config builds the whole hint; no intermediate
+            # name lists.
+            available = ', '.join(f'{prof_id} ({name})' for prof_id, (name, _) in config.items())
+            raise Exception(f'No configuration found for professor "{professor}". '
+                            + (f'Available: {available}.' if available
+                               else 'Set the PROF_<ID>_NAME and PROF_<ID>_KEY environment variables.'))
+        display_name, key_var = entry
+        # Primary and backup keys share one tuple-driven loop: a single
+        # walrus-tested branch per probe instead of duplicated lookup blocks.
+        for var in (key_var, key_var.removesuffix('_KEY') + '_BACKUP_KEY'):
+            if api_key := os.getenv(var):
+                return api_key
+        raise Exception(f'No API key found for {display_name}. Set the {key_var} environment variable.')
+    api_key = os.getenv('API_KEY')
+    if not api_key:
+        # The .env fallback is only consulted (and the file only opened) when
+        # the variable is not already set.
+        load_env_file()
+        api_key = os.getenv('API_KEY')
+    if not api_key:
+        raise Exception('No API key found. Set the API_KEY environment variable.')
+    return api_key
 
-# Set up global variables for script
-file = args.input_PDF
-custom_text = args.custom_text
-language = args.input_type
-page_nums = validate_page_nums(args.page_nums) if args.page_nums else None
-abstract = args.abstract
-API_KEY = os.getenv('API_KEY')  # get API key from environment variables
 
+def process_pdf(f: BinaryIO) -> Tuple[Iterator[Any], Any, Any]:
+    from pdfminer.converter import PDFPageAggregator
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
 
-def process_pdf(f: BinaryIO) -> Tuple[Iterator[PDFPage], PDFPageAggregator, PDFPageInterpreter]:
     rsrcmgr = PDFResourceManager()
     laparams = LAParams()
     device = PDFPageAggregator(rsrcmgr, laparams=laparams)
@@ -87,8 +360,10 @@ def extract_page_nums() -> Tuple[int, int]:
     return start_page - 1, end_page
 
 
-def parse_layout(layout: LTPage) -> str:
+def parse_layout(layout: Any) -> str:
     """Function to parse the layout tree."""
+    from pdfminer.layout import LTTextContainer, LTTextBox, LTTextLine, LTFigure, LTChar
+
     result = []
     stack = list(layout)  # Using a list as a stack
 
@@ -102,18 +377,153 @@ def parse_layout(layout: LTPage) -> str:
     return "".join(result)
 
 
+def parse_text_into_paragraphs(content: str) -> List[str]:
+    """Splits extracted text into non-empty paragraphs with one compiled-regex pass."""
+    if not content:
+        return []
+    return [part.strip() for part in PARAGRAPH_BREAK_PATTERN.split(content) if part and not part.isspace()]
+
+
+def open_mapped(path: str) -> BinaryIO:
+    """Opens a file as a read-only memory map.
+
+    The parsers then slice the OS page cache directly instead of pulling the
+    file through Python's buffered-read path chunk by chunk. Falls back to an
+    in-memory copy for empty files or filesystems that refuse to map.
+    """
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            f.seek(0)
+            return io.BytesIO(f.read())
+
+
+def detect_file_type(head: bytes, f: BinaryIO) -> str:
+    """Identifies the input format from its first bytes.
+
+    Everything is decided on the one already-open handle: zip containers are
+    told apart from DOCX by probing the archive's central directory for
+    word/document.xml rather than re-opening the file.
+    """
+    import zipfile
+
+    for signature, file_type in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            if file_type != 'zip':
+                return file_type
+            try:
+                with zipfile.ZipFile(f) as archive:
+                    return 'docx' if 'word/document.xml' in archive.namelist() else 'unknown'
+            except zipfile.BadZipFile:
+                return 'unknown'
+            finally:
+                f.seek(0)
+    if b'\x00' not in head:
+        return 'txt'
+    return 'unknown'
+
+
+def split_text_into_pages(paragraphs: List[str], target_page_size: int = TARGET_PAGE_SIZE) -> Iterator[str]:
+    """Greedily joins paragraphs into page-sized chunks, yielded lazily.
+
+    Pages are tracked as index ranges into the paragraph list, so each flush
+    is a single join over a slice — no per-page accumulator list to grow.
+    """
+    start = 0
+    current_size = 0
+    for i, paragraph in enumerate(paragraphs):
+        if i > start and current_size + len(paragraph) > target_page_size:
+            yield '\n\n'.join(paragraphs[start:i])
+            start = i
+            current_size = 0
+        current_size += len(paragraph) + 2
+    if start < len(paragraphs):
+        yield '\n\n'.join(paragraphs[start:])
+
+
+def iter_docx_paragraphs(f: BinaryIO) -> Iterator[str]:
+    """Yields stripped, non-empty paragraph texts from a DOCX stream.
+
+    The fast path feeds word/document.xml straight out of the zip into
+    iterparse, so neither the raw XML string nor a full DOM is ever
+    materialized: each finished <w:p> is read, cleared, and its already
+    consumed siblings dropped, keeping peak memory at one paragraph.
+    python-docx remains as the fallback when lxml is unavailable.
+    """
+    import zipfile
+    try:
+        from lxml import etree
+    except ImportError:
+        from docx import Document
+
+        for paragraph in Document(f).paragraphs:
+            raw = paragraph.text
+            if raw:
+                text = raw.strip()
+                if text:
+                    yield text
+        return
+
+    with zipfile.ZipFile(f) as archive, archive.open('word/document.xml') as part:
+        for _, element in etree.iterparse(part, events=('end',), tag=WORD_P_TAG, huge_tree=True):
+            # Empty separator paragraphs are common in Word; checking the raw
+            # join first skips the strip() allocation for them entirely.
+            raw = ''.join(t.text or '' for t in element.iter(WORD_T_TAG))
+            if raw:
+                text = raw.strip()
+                if text:
+                    yield text
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def extract_docx_page_texts(f: BinaryIO, target_page_size: int = TARGET_PAGE_SIZE) -> Iterator[str]:
+    """Yields page-sized chunks of a DOCX body in one pass over its paragraphs.
+
+    Each paragraph is stripped and accumulated straight into the current
+    chunk — no intermediate list of every paragraph is materialized first.
+    """
+    current: List[str] = []
+    current_size = 0
+    for text in iter_docx_paragraphs(f):
+        if current and current_size + len(text) > target_page_size:
+            yield '\n\n'.join(current)
+            current = []
+            current_size = 0
+        current.append(text)
+        current_size += len(text) + 2
+    if current:
+        yield '\n\n'.join(current)
+
+
 def generate_process_text(abstract_text: str, page_text: str, previous_page: str) -> str:
+    # The context comes first and the page text last so the stable part of the
+    # prompt (instructions plus abstract) forms an identical prefix on every
+    # call, which lets the API reuse its automatic prompt-prefix cache.
     context = abstract_text if abstract_text else previous_page[int(len(previous_page) * .65):]
     if context:
-        context = f"--Context: \n{context}"
-    return f"--Current Page: \n{page_text}\n{context}"
+        context = f"--Context: \n{context}\n"
+    return f"{context}--Current Page: \n{page_text}"
+
+
+log_configured = False
 
 
 def setup_logging():
+    # basicConfig is a no-op after the first call but still takes the logging
+    # lock and walks the handler list; the flag skips it entirely.
+    global log_configured
+    if log_configured:
+        return
     logging.basicConfig(level=logging.INFO)
+    log_configured = True
+
 
+def api_call(requests_function: Callable[..., Any], url: str, **kwargs: Any) -> Union[Any, None]:
+    from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, RequestException
 
-def api_call(requests_function: Callable[..., Response], url: str, **kwargs: Any) -> Union[str, None]:
     try:
         response = requests_function(url, **kwargs)
         response.raise_for_status()  # Raise an HTTPError if the status is 4xx, 5xx
@@ -127,37 +537,108 @@ def api_call(requests_function: Callable[..., Response], url: str, **kwargs: Any
         logging.error('The request exceeded the configured number of maximum redirections.')
         response = None
     except RequestException as req_exception:
-        logging.error(f'An ambiguous exception occurred while handling the request: {req_exception}')
+        logging.error('An ambiguous exception occurred while handling the request: %s', req_exception)
         response = None
     return response
 
 
-def translate_text(text: str) -> str:
-    setup_logging()
+def cache_key(prompt_system: str, prompt_user: str) -> str:
+    # OCR output of the same page rarely hashes identically between runs
+    # (stray spaces, shifted line breaks), so the key is computed over a
+    # whitespace-normalized copy of the prompt to catch those near-duplicates.
+    normalized_user = WHITESPACE_RUN_PATTERN.sub(' ', prompt_user).strip()
+    payload = json.dumps({"model": MODEL, "system": prompt_system, "user": normalized_user}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_get(key: str) -> Optional[str]:
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            return json.load(cache_file)["content"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def cache_set(key: str, content: str) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    with open(path, 'w', encoding='utf-8') as cache_file:
+        json.dump({"content": content}, cache_file, ensure_ascii=False)
+
+
+token_usage_lock = threading.Lock()
+pending_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+usage_flusher_started = False
+TOKEN_USAGE_FLUSH_INTERVAL = 2.0  # seconds between background flushes
+
+
+def flush_token_usage() -> None:
+    """Merges the in-memory token counts into the on-disk totals."""
+    with token_usage_lock:
+        if not any(pending_usage.values()):
+            return
+        try:
+            with open(TOKEN_USAGE_FILE, 'rb') as usage_file:
+                raw = usage_file.read()
+            totals = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except (OSError, ValueError):
+            totals = {key: 0 for key in pending_usage}
+        for key in totals:
+            totals[key] += pending_usage.get(key, 0)
+        for key in pending_usage:
+            pending_usage[key] = 0
+        os.makedirs(os.path.dirname(TOKEN_USAGE_FILE), exist_ok=True)
+        temp_path = f"{TOKEN_USAGE_FILE}.tmp"
+        with open(temp_path, 'wb') as usage_file:
+            usage_file.write(orjson.dumps(totals) if orjson is not None
+                             else json.dumps(totals).encode('utf-8'))
+        os.replace(temp_path, TOKEN_USAGE_FILE)
+
+
+def run_usage_flusher() -> None:
+    while True:
+        time.sleep(TOKEN_USAGE_FLUSH_INTERVAL)
+        flush_token_usage()
+
+
+def record_token_usage(usage: dict) -> None:
+    """Adds an API response's token counts to the in-memory running totals.
 
-    url = "https://api.openai.com/v1/chat/completions"
+    The hot path only increments counters; a daemon thread rewrites the JSON
+    file at most every TOKEN_USAGE_FLUSH_INTERVAL seconds, and an atexit hook
+    flushes whatever is left so nothing is lost on a clean exit.
+    """
+    if not usage:
+        return
+    global usage_flusher_started
+    with token_usage_lock:
+        for key in pending_usage:
+            pending_usage[key] += usage.get(key, 0)
+        if not usage_flusher_started:
+            usage_flusher_started = True
+            threading.Thread(target=run_usage_flusher, daemon=True).start()
+            atexit.register(flush_token_usage)
+
+
+def request_chat_completion(prompt_system: str, prompt_user: str) -> str:
+    from requests import post
+
+    key = cache_key(prompt_system, prompt_user)
+    if not no_cache:
+        cached = cache_get(key)
+        if cached is not None:
+            logging.info('Using cached translation.')
+            return cached
+
+    url = f"{API_BASE}/chat/completions"
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
+        "Authorization": f"Bearer {get_api_key()}"
     }
 
-    prompt_system = (f'Follow the instructions carefully. Please act as a professional translator from {language} '
-                     f'to English. I will provide you with text from a PDF document, and your task is '
-                     f'to translate it from {language} to English. Please only output the translation and do not '
-                     f'output any irrelevant content. If there are garbled characters or other non-standard text '
-                     f'content, delete the garbled characters. '
-                     f'You can format and line break the output yourself using "\\n" for line breaks. '
-                     f'You may be provided with "--Context: " and the text from either the document\'s abstract or '
-                     f'a sample of text from the previous page. You will also be provided with "--Current Page: " '
-                     f'which includes the OCR characters of the current page. Only output the English translation of '
-                     f'the "--Current Page: ". Do not output the context, nor the "--Context: " and "--Current Page: " '
-                     f'labels.')
-    prompt_user = (f'Translate only the {language} text of the "--Current Page: ", without outputting any other '
-                   f'content, and without outputting anything related to "--Context: ", if provided. Do not provide '
-                   f'any prompts to the user, for example: "This is the translation of the current page.":\n') + text
-
     data = {
-        "model": "gpt-3.5-turbo",
+        "model": MODEL,
         "messages": [
             {
                 "role": "system",
@@ -169,7 +650,7 @@ def translate_text(text: str) -> str:
             }
         ]
     }
-    print(data)
+    logging.debug('Request payload: %s', data)
     response = api_call(
         post, url,
         headers=headers,
@@ -183,15 +664,21 @@ def translate_text(text: str) -> str:
 
     response_data = json.loads(response.text)
     logging.info('API call successful.')
-    print(response_data)
+    logging.debug('Response payload: %s', response_data)
 
     if 'error' in response_data and response_data['error']['code'] == "context_length_exceeded":
         return "context_length_exceeded"
+    record_token_usage(response_data.get("usage", {}))
     content = response_data["choices"][0]["message"]["content"]
-    # content = 'test'
+    if not no_cache:
+        cache_set(key, content)
     return content
 
 
+def translate_text(text: str) -> str:
+    return request_chat_completion(PROMPT_SYSTEM_PAGE, PROMPT_USER_PREFIX_PAGE + text)
+
+
 def translate_page_text(abstract_text: str, page_text: str, previous_page: str) -> str:
     process_text = generate_process_text(abstract_text, page_text, previous_page)
     translated_text = translate_text(process_text)
@@ -219,34 +706,388 @@ def generate_text(abstract_text: str, page_text: str, previous_page: str, i: int
     return returned_text
 
 
-def translate_document(pages: Iterator[PDFPage], interpreter: Any,
-                       device: PDFPageAggregator, abstract_text: Optional[str]) -> List[str]:
-    document_text = []
+def translate_page_batch(batch: List[Tuple[int, str]], abstract_text: Optional[str],
+                         previous_text: str) -> List[str]:
+    """Translates a batch of pages in a single API call, with per-page fallback.
+
+    The pages are sent as numbered "<<n>>" sections so one request amortizes the
+    network round-trip and the system prompt across the whole batch. If the
+    reply cannot be parsed back into the same sections, each page falls back to
+    the original one-call-per-page path.
+    """
+    if len(batch) > 1:
+        sections = "\n".join(f"<<{n}>>\n{page_text}" for n, (_, page_text) in enumerate(batch, start=1))
+        translated = request_chat_completion(PROMPT_SYSTEM_BATCH, PROMPT_USER_PREFIX_BATCH + sections)
+        if translated != "context_length_exceeded":
+            parsed = {int(num): text.strip() for num, text in SECTION_TAG_PATTERN.findall(translated)}
+            # The count alone is not enough: a reply with shifted numbering
+            # would KeyError below, so every expected section must be present.
+            if all(n in parsed for n in range(1, len(batch) + 1)):
+                return [f"\n\n-- Page {i + 1} -- \n\n" + parsed[n]
+                        for n, (i, _) in enumerate(batch, start=1)]
+        logging.warning('Batched translation could not be parsed; falling back to per-page calls.')
+
+    result = []
+    for i, page_text in batch:
+        result.append(generate_text(abstract_text, page_text, previous_text, i))
+        previous_text = page_text
+    return result
+
+
+def extract_page_texts(f: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """Yields the requested page range as (page index, text) pairs.
+
+    Uses PyMuPDF when available, which decodes text streams in native code;
+    otherwise falls back to pdfminer's pure-Python layout analysis. Pages are
+    yielded one at a time so translation can start before extraction finishes.
+    """
+    # PyMuPDF extracts text in native code and is 10-50x faster than pdfminer,
+    # but it stays optional; pdfminer remains the fallback when it is missing.
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
     start_page, end_page = extract_page_nums()
+
+    if fitz is not None:
+        doc = fitz.open(stream=f.read(), filetype="pdf")
+        last_page = doc.page_count - 1 if end_page is None else min(end_page, doc.page_count - 1)
+        for i in range(start_page, last_page + 1):
+            yield i, "\n\n".join(parse_text_into_paragraphs(doc.load_page(i).get_text("text")))
+        return
+
+    pages, device, interpreter = process_pdf(f)
     pages = islice(pages, start_page, end_page + 1 if end_page is not None else None)
-    page_text = ""
-    for i, page in tqdm(enumerate(pages, start=start_page), desc="Translating... ", ascii=True):
+    for i, page in enumerate(pages, start=start_page):
         interpreter.process_page(page)
         layout = device.get_result()
-        previous_page = page_text
-        page_text = parse_layout(layout)
-        translated_text = generate_text(abstract_text, page_text, previous_page, i)
-        document_text.append(translated_text)
+        yield i, "\n\n".join(parse_text_into_paragraphs(parse_layout(layout)))
+
+
+def translate_document(page_texts: Iterator[Tuple[int, str]], abstract_text: Optional[str],
+                       out: TextIO) -> None:
+    """Streams extracted pages into concurrently translated batches.
+
+    Each batch is submitted to the pool the moment it fills, so the first
+    request goes out after one batch of extraction rather than after the whole
+    document, and only the pages of the batch under construction are buffered.
+    Completed pages are written straight into `out` instead of being collected
+    in a list, so the document is never held in memory twice.
+    """
+    from tqdm import tqdm
+
+    futures = []
+    batch: List[Tuple[int, str]] = []
+    batch_size = 0
+    previous_text = ""
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        def submit_batch() -> None:
+            nonlocal batch, batch_size, previous_text
+            futures.append(executor.submit(translate_page_batch, batch, abstract_text, previous_text))
+            previous_text = batch[-1][1]
+            batch = []
+            batch_size = 0
+
+        for i, page_text in page_texts:
+            new_size = batch_size + len(page_text)
+            overflows = new_size > BATCH_CHAR_BUDGET and not (
+                batch_size < BATCH_UNDERFILL_RATIO * BATCH_CHAR_BUDGET
+                and new_size <= BATCH_OVERFLOW_RATIO * BATCH_CHAR_BUDGET)
+            if batch and (len(batch) >= BATCH_MAX_PAGES or overflows):
+                submit_batch()
+            batch.append((i, page_text))
+            batch_size += len(page_text)
+        if batch:
+            submit_batch()
+
+        for future in tqdm(futures, desc="Translating... ", ascii=True):
+            for translated_text in future.result():
+                out.write(translated_text)
+
+
+def load_pending_batches() -> dict:
+    try:
+        with open(PENDING_BATCHES_FILE, encoding='utf-8') as pending_file:
+            return json.load(pending_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_pending_batches(pending: dict) -> None:
+    os.makedirs(os.path.dirname(PENDING_BATCHES_FILE), exist_ok=True)
+    with open(PENDING_BATCHES_FILE, 'w', encoding='utf-8') as pending_file:
+        json.dump(pending, pending_file)
+
+
+def translate_document_batch(page_texts: Iterator[Tuple[int, str]], abstract_text: Optional[str],
+                             out: TextIO) -> None:
+    """Translates a whole document through the OpenAI Batch API.
+
+    Batch jobs cost half as much per token and are not counted against
+    per-minute rate limits, at the price of up to 24 hours of turnaround.
+    The batch id is recorded in PENDING_BATCHES_FILE so an interrupted run
+    resumes polling the same job instead of resubmitting it.
+    """
+    from requests import get, post
+
+    headers = {"Authorization": f"Bearer {get_api_key()}"}
+    pending = load_pending_batches()
+    batch_id = pending.get(file)
+
+    if batch_id is None:
+        lines = []
+        previous_page = ""
+        for i, page_text in page_texts:
+            process_text = generate_process_text(abstract_text, page_text, previous_page)
+            body = {
+                "model": MODEL,
+                "messages": [
+                    {"role": "system", "content": PROMPT_SYSTEM_PAGE},
+                    {"role": "user", "content": PROMPT_USER_PREFIX_PAGE + process_text}
+                ]
+            }
+            lines.append(json.dumps({"custom_id": f"page_{i}", "method": "POST",
+                                     "url": "/v1/chat/completions", "body": body}, ensure_ascii=False))
+            previous_page = page_text
 
-    return document_text
+        response = api_call(
+            post, f"{API_BASE}/files",
+            headers=headers,
+            files={"file": ("batch_input.jsonl", "\n".join(lines).encode('utf-8'))},
+            data={"purpose": "batch"},
+            timeout=240
+        )
+        if response is None:
+            raise Exception('Uploading the batch input file was not successful.')
+        input_file_id = json.loads(response.text)["id"]
+
+        response = api_call(
+            post, f"{API_BASE}/batches",
+            headers=headers,
+            json={"input_file_id": input_file_id, "endpoint": "/v1/chat/completions",
+                  "completion_window": "24h"},
+            timeout=240
+        )
+        if response is None:
+            raise Exception('Creating the batch job was not successful.')
+        batch_id = json.loads(response.text)["id"]
+        pending[file] = batch_id
+        save_pending_batches(pending)
+        logging.info('Submitted batch %s.', batch_id)
+
+    while True:
+        response = api_call(get, f"{API_BASE}/batches/{batch_id}", headers=headers, timeout=240)
+        if response is None:
+            raise Exception('Checking the batch status was not successful.')
+        batch_status = json.loads(response.text)
+        status = batch_status["status"]
+        if status == "completed":
+            break
+        if status in ("failed", "expired", "cancelled"):
+            raise Exception(f'Batch {batch_id} ended with status "{status}".')
+        logging.info('Batch %s is %s; checking again in %ss.', batch_id, status, BATCH_POLL_INTERVAL)
+        time.sleep(BATCH_POLL_INTERVAL)
+
+    response = api_call(get, f"{API_BASE}/files/{batch_status['output_file_id']}/content",
+                        headers=headers, timeout=240)
+    if response is None:
+        raise Exception('Downloading the batch results was not successful.')
+
+    results = {}
+    for line in response.text.splitlines():
+        record = json.loads(line)
+        i = int(record["custom_id"].split("_")[1])
+        record_body = record["response"]["body"]
+        record_token_usage(record_body.get("usage", {}))
+        results[i] = record_body["choices"][0]["message"]["content"]
+
+    del pending[file]
+    save_pending_batches(pending)
+    for i, translated in sorted(results.items()):
+        # Header and page body go out as one write so each record hits the
+        # sink (and, for unbuffered sinks, the kernel) in a single call.
+        out.write(f"\n\n-- Page {i + 1} -- \n\n{translated}")
+
+
+def output_format_for(path: str) -> str:
+    """Maps an output path to its format with one splitext and dict lookup."""
+    return OUTPUT_FORMATS.get(os.path.splitext(path)[1].lower(), 'txt')
+
+
+@functools.cache
+def load_reportlab() -> Tuple[Any, Any, Any, Any]:
+    """Binds the ReportLab pieces save_to_pdf needs, once per process."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    return SimpleDocTemplate, Paragraph, Spacer, letter
+
+
+@functools.cache
+def get_pdf_style() -> Any:
+    """Builds the PDF paragraph style once; every document reuses it.
+
+    getSampleStyleSheet() rebuilds a full stylesheet per call, which is pure
+    waste across repeated PDF saves. Shape checking is also switched off
+    here: ReportLab revalidates attribute shapes on every Paragraph/Spacer
+    construction otherwise.
+    """
+    from reportlab import rl_config
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    rl_config.shapeChecking = 0
+    return getSampleStyleSheet()['Normal']
+
+
+def save_to_pdf(content: str, path: str) -> None:
+    """Renders a finished translation as a paragraph-per-block PDF."""
+    SimpleDocTemplate, Paragraph, Spacer, letter = load_reportlab()
+    style = get_pdf_style()
+    story = []
+    # One Spacer serves every gap: build() only reads flowables during
+    # layout, so the shared instance saves an allocation per paragraph.
+    spacer = Spacer(1, 12)
+    # Paragraph parses mini-XML markup, so the text must be escaped — done in
+    # one pass over the whole document rather than once per block — and line
+    # breaks become <br/> tags. finditer walks the blocks without holding a
+    # full split list alongside the text.
+    for match in PARAGRAPH_BLOCK_PATTERN.finditer(html.escape(content)):
+        block = match.group().rstrip()
+        story.append(Paragraph(block.translate(LINE_BREAK_TABLE), style))
+        story.append(spacer)
+    SimpleDocTemplate(path, pagesize=letter).build(story)
+
+
+ensured_dirs: set = set()
+
+
+def ensure_parent_dir(path: str) -> None:
+    """Creates the destination directory, string ops only — no Path objects.
+
+    Directories already created this run are remembered, so repeat saves
+    into the same place skip the mkdir syscall entirely.
+    """
+    parent = os.path.dirname(path) or '.'
+    if parent not in ensured_dirs:
+        os.makedirs(parent, exist_ok=True)
+        ensured_dirs.add(parent)
+
+
+def save_translation(content: str, path: str) -> None:
+    """Writes a finished translation in the format implied by the extension."""
+    ensure_parent_dir(path)
+    if output_format_for(path) == 'pdf':
+        save_to_pdf(content, path)
+    else:
+        # Encode once and write the bytes directly: the text layer would
+        # re-encode through its own buffer, holding a second full copy of a
+        # large translation. The buffer is sized so big files go out in a
+        # single write.
+        data = content.encode('utf-8')
+        with open(path, 'wb', buffering=max(1 << 20, len(data))) as out_file:
+            out_file.write(data)
+            if len(data) > (1 << 20):
+                # The translation is write-once from our side; telling the
+                # kernel its pages will not be re-read keeps a big output
+                # from evicting more useful page cache. Purely advisory.
+                out_file.flush()
+                try:
+                    os.posix_fadvise(out_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                except (AttributeError, OSError):
+                    pass
+
+
+def show_usage_report() -> None:
+    """Prints the accumulated token totals from the local usage log."""
+    try:
+        with open(TOKEN_USAGE_FILE, 'rb') as usage_file:
+            raw = usage_file.read()
+        totals = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    # One write, one flush: line-buffered TTY stdout would otherwise flush
+    # (and lock) once per print call.
+    sys.stdout.write(
+        "Token Usage Report\n"
+        + "-" * 40 + "\n"
+        f"Prompt tokens:     {totals.get('prompt_tokens', 0):,}\n"
+        f"Completion tokens: {totals.get('completion_tokens', 0):,}\n"
+        f"Total tokens:      {totals.get('total_tokens', 0):,}\n"
+    )
 
 
 def main() -> None:
+    parser = create_argument_parser()
+    args = parser.parse_args()
+
+    # Admin path: report and exit without touching any translation state.
+    if args.usage_report:
+        set_professor(args.professor)
+        show_usage_report()
+        return
+
+    setup_logging()
+
+    if args.input_type is None:
+        parser.error('one of the arguments -C/--Chinese -J/--Japanese -K/--Korean is required')
+    if not (args.input_PDF or args.custom_text):
+        parser.error('one of the arguments -i/--input_PDF -c/--custom_text is required')
+
+    configure(args)
     if file:
         abstract_text = input('Enter abstract text: ') if abstract else None
-        with open(file, 'rb') as f:
-            pages, device, interpreter = process_pdf(f)
-            document_text = translate_document(pages, interpreter, device, abstract_text)
-        print("".join(document_text))
+        with open_mapped(file) as f:
+            head = f.read(8192)
+            file_type = detect_file_type(head, f)
+            f.seek(0)
+            if file_type == 'pdf':
+                page_texts = extract_page_texts(f)
+            elif file_type == 'txt':
+                paragraphs = parse_text_into_paragraphs(f.read().decode('utf-8', errors='replace'))
+                start_page, end_page = extract_page_nums()
+                page_texts = islice(enumerate(split_text_into_pages(paragraphs)),
+                                    start_page, end_page + 1 if end_page is not None else None)
+            elif file_type == 'docx':
+                start_page, end_page = extract_page_nums()
+                page_texts = islice(enumerate(extract_docx_page_texts(f)),
+                                    start_page, end_page + 1 if end_page is not None else None)
+            else:
+                # SystemExit prints to stderr and sets exit code 1 — a usage
+                # error should not come with a traceback.
+                sys.exit(f'Error: {file} is not a supported file type. Provide a PDF, DOCX, or plain-text file.')
+            # Pages stream straight to the destination as they complete; the
+            # full translation is never materialized in memory.
+            translate = translate_document_batch if use_batch_api else translate_document
+            if output_path:
+                ensure_parent_dir(output_path)
+                if output_format_for(output_path) == 'pdf':
+                    # The PDF layout pass needs the whole text, so this is the
+                    # one sink that buffers instead of streaming.
+                    buffer = io.StringIO()
+                    translate(page_texts, abstract_text, buffer)
+                    save_to_pdf(buffer.getvalue(), output_path)
+                else:
+                    with open(output_path, 'w', encoding='utf-8') as out_file:
+                        translate(page_texts, abstract_text, out_file)
+                print(f'Translation saved to {output_path}')
+            else:
+                translate(page_texts, abstract_text, sys.stdout)
+                print()
     elif custom_text:
-        text_input = input('Enter custom text to be translated: ')
+        # One buffered binary read to EOF and a single decode: no per-line
+        # readline machinery, no incremental text decoding, and invalid UTF-8
+        # in a paste degrades to replacement characters instead of a crash.
+        # Ctrl-D (Ctrl-Z on Windows) ends the input.
+        print('Enter custom text to be translated, then press Ctrl-D:')
+        text_input = sys.stdin.buffer.read().decode('utf-8', errors='replace')
         translated_text = generate_text('', text_input, '', 0)
-        print(translated_text)
+        if output_path:
+            save_translation(translated_text, output_path)
+            print(f'Translation saved to {output_path}')
+        else:
+            print(translated_text)
 
 
 if __name__ == '__main__':